@@ -0,0 +1,50 @@
+"""
+Migration script to add a unique (survey_id, "order") constraint to the question table.
+Run this once to update existing database schema.
+"""
+
+import asyncio
+import logging
+from sqlalchemy import text
+from db import async_engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def add_question_order_constraint():
+    """Add uq_question_survey_id_order constraint to question table."""
+    try:
+        async with async_engine.begin() as conn:
+            # Check if constraint already exists
+            check_query = text("""
+                SELECT constraint_name 
+                FROM information_schema.table_constraints 
+                WHERE table_name = 'question' AND constraint_name = 'uq_question_survey_id_order'
+            """)
+            result = await conn.execute(check_query)
+            existing_constraint = result.fetchone()
+            
+            if existing_constraint:
+                logger.info("Constraint 'uq_question_survey_id_order' already exists on question table.")
+                return
+            
+            # Add the new constraint (fails if a survey already has duplicate orders)
+            alter_query = text("""
+                ALTER TABLE question 
+                ADD CONSTRAINT uq_question_survey_id_order UNIQUE (survey_id, "order")
+            """)
+            await conn.execute(alter_query)
+            logger.info("Successfully added 'uq_question_survey_id_order' constraint to question table.")
+            
+    except Exception as e:
+        logger.error(f"Error adding question order constraint: {e}")
+        raise
+
+async def main():
+    """Run the migration."""
+    logger.info("Starting question order constraint migration...")
+    await add_question_order_constraint()
+    logger.info("Migration completed successfully!")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+"""
+Migration script to add the sheets_exported flag (and its partial index) to the response table.
+Run this once to update existing database schema.
+"""
+
+import asyncio
+import logging
+from sqlalchemy import text
+from db import async_engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def add_sheets_exported_field():
+    """Add sheets_exported field to response table."""
+    try:
+        async with async_engine.begin() as conn:
+            # Check if column already exists
+            check_query = text("""
+                SELECT column_name 
+                FROM information_schema.columns 
+                WHERE table_name = 'response' AND column_name = 'sheets_exported'
+            """)
+            result = await conn.execute(check_query)
+            existing_column = result.fetchone()
+            
+            if existing_column:
+                logger.info("Column 'sheets_exported' already exists in response table.")
+                return
+            
+            # Existing rows count as exported so history isn't appended to Sheets again
+            await conn.execute(text("""
+                ALTER TABLE response 
+                ADD COLUMN sheets_exported BOOLEAN DEFAULT TRUE NOT NULL
+            """))
+            await conn.execute(text("ALTER TABLE response ALTER COLUMN sheets_exported SET DEFAULT FALSE"))
+            await conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_response_sheets_pending 
+                ON response (id) WHERE NOT sheets_exported
+            """))
+            # The old id cursor table is no longer used
+            await conn.execute(text("DROP TABLE IF EXISTS sheetssynccursor"))
+            logger.info("Successfully added 'sheets_exported' column to response table.")
+            
+    except Exception as e:
+        logger.error(f"Error adding sheets_exported field: {e}")
+        raise
+
+async def main():
+    """Run the migration."""
+    logger.info("Starting response sheets_exported migration...")
+    await add_sheets_exported_field()
+    logger.info("Migration completed successfully!")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -16,6 +16,7 @@ import logging
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
+from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
 from aiogram.types import BotCommand, BotCommandScopeAllPrivateChats
 
 from config import settings
@@ -61,7 +62,10 @@ async def async_main():
     # Explicitly creating default bot properties for clarity
     default_properties = DefaultBotProperties(parse_mode=ParseMode.HTML)
     bot = Bot(settings.bot_token, default=default_properties)
-    dp = Dispatcher()
+    # FSM state lives in process memory: survey answers never leave the bot process for state I/O
+    # Per-user event isolation: survey answers are buffered in state, so a user's updates
+    # must not read and write it concurrently (that would flush the same rows twice)
+    dp = Dispatcher(storage=MemoryStorage(), events_isolation=SimpleEventIsolation())
     # Add dispatcher instance to workflow data for injection
     dp["dp_instance"] = dp 
 
@@ -4,7 +4,7 @@ from aiogram.types import Message
 # Import necessary for state check and bot object
 from aiogram.fsm.context import FSMContext
 from aiogram import Bot
-from student_flow.survey_handlers import SurveyResponseStates # Import the state
+from student_flow.survey_handlers import SurveyResponseStates, flush_buffered_answers # Import the state
 
 # Import checkers from other flows
 from utils.auth_checks import is_admin, get_user_role, set_commands_for_user # Use centralized check
@@ -30,11 +30,12 @@ async def cmd_help(msg: Message, state: FSMContext, bot: Bot): # Add state and b
         state_name = current_state # Store state name before clearing
         logger.info(f"User {user_id} used /help, cancelling previous state: {state_name}")
         data = await state.get_data()
+        await flush_buffered_answers(state, user_id) # Save survey answers not yet written to the DB
         await state.clear() # Clear state first
         await msg.answer("(Предыдущая операция отменена)") # Generic cancellation message
         
         # Specific cleanup if it was a survey
-        if state_name == SurveyResponseStates.awaiting_answer:
+        if state_name == SurveyResponseStates.answering:
             last_msg_id = data.get("last_question_message_id")
             if last_msg_id:
                 try:
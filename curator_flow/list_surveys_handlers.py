@@ -7,9 +7,9 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message, CallbackQuery
 from sqlmodel import select
 
-from config import settings
 from curator_flow.group_handlers import curator_guard
 from db import async_session
+from utils.auth_checks import is_admin
 from models import Course, Group, Question, Survey, Response
 from utils.keyboards import get_course_selection_keyboard, get_group_selection_keyboard, get_confirmation_keyboard
 from utils.constants import NO_COURSES_FOUND
@@ -157,7 +157,7 @@ async def list_surveys_group_selected(callback: CallbackQuery, state: FSMContext
     )
 
     # If there are unnamed surveys, add cleanup tip for admins
-    if len(surveys) > len(surveys_with_title) and callback.from_user.id in settings.admin_id_set:
+    if len(surveys) > len(surveys_with_title) and is_admin(callback.from_user.id, callback.from_user.username):
         message_parts.append("\n<i>Администраторам:</i> Используйте /cleanup_surveys для удаления устаревших опросов без названия")
 
     # Combine parts into message (this ensures we don't exceed message limits)
@@ -174,14 +174,7 @@ async def cleanup_surveys_start(msg: Message, state: FSMContext):
     # Admin authorization check - check both ID and username
     user_id = msg.from_user.id
     username = msg.from_user.username
-    is_admin = False
-    
-    if user_id in settings.admin_id_set:
-        is_admin = True
-    elif username and f"@{username.lower()}" in settings.admin_id_set:
-        is_admin = True
-    
-    if not is_admin:
+    if not is_admin(user_id, username):
         logger.warning(f"Non-admin user {user_id} (@{username}) attempted to access /cleanup_surveys")
         await msg.answer("⛔ Эта команда доступна только администраторам.")
         return
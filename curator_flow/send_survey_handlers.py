@@ -18,11 +18,10 @@ from models import Course, Group, Question, Student, Survey, GroupStudent, Quest
 from utils.keyboards import (
     get_course_selection_keyboard, 
     get_group_selection_keyboard,
-    get_scale_keyboard,
-    get_skip_keyboard
 )
 from utils.constants import NO_COURSES_FOUND
-from student_flow.survey_handlers import SurveyResponseStates
+from utils.callback_data import SurveyAnonymityCB
+from student_flow.survey_handlers import SurveyResponseStates, flush_buffered_answers
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -380,6 +379,9 @@ async def send_now_survey_selected(callback: CallbackQuery, state: FSMContext, b
             return
         
         first_question = questions[0]
+        # Snapshot of the questions handed to every student's FSM state,
+        # so answering the survey needs no further question queries
+        questions_snapshot = [{"id": q.id, "text": q.text, "q_type": q.q_type.value} for q in questions]
         
         # Получаем студентов
         students_stmt = (
@@ -402,7 +404,7 @@ async def send_now_survey_selected(callback: CallbackQuery, state: FSMContext, b
         if i > 0:
             await asyncio.sleep(0.1)  # 100ms delay between sends
             
-        result = await initiate_survey_for_student(bot, dp_instance, student, first_question, survey_id)
+        result = await initiate_survey_for_student(bot, dp_instance, student, first_question, survey_id, questions_snapshot)
         if result:
             successful_sends += 1
     
@@ -425,7 +427,14 @@ async def send_now_survey_selected(callback: CallbackQuery, state: FSMContext, b
     await state.clear()
 
 # Helper function to send the first question and set student state
-async def initiate_survey_for_student(bot: Bot, dp: Dispatcher, student: Student, first_question: Question, survey_id: int):
+async def initiate_survey_for_student(
+    bot: Bot,
+    dp: Dispatcher,
+    student: Student,
+    first_question: Question,
+    survey_id: int,
+    questions_snapshot: Optional[List[Dict[str, Any]]] = None
+):
     if not student.tg_user_id:
         logger.warning(f"Cannot initiate survey for student '{student.tg_username}' (ID: {student.id}) - missing tg_user_id")
         return False # Indicate failure
@@ -438,21 +447,21 @@ async def initiate_survey_for_student(bot: Bot, dp: Dispatcher, student: Student
     try:
         # Получаем информацию о группе и курсе
         async with async_session() as session:
-            survey = await session.get(Survey, survey_id)
-            if not survey:
-                logger.error(f"Cannot initiate survey: Survey ID {survey_id} not found")
-                return False
-                
-            group = await session.get(Group, survey.group_id)
-            if not group:
-                logger.error(f"Cannot initiate survey: Group for Survey ID {survey_id} not found")
+            # Survey, group and course in one round-trip
+            context_stmt = (
+                select(Survey, Group.name, Course.name)
+                .join(Group, Group.id == Survey.group_id)
+                .outerjoin(Course, Course.id == Group.course_id)
+                .where(Survey.id == survey_id)
+            )
+            context_row = (await session.execute(context_stmt)).first()
+            if not context_row:
+                logger.error(f"Cannot initiate survey: Survey ID {survey_id} or its group not found")
                 return False
+            survey, group_name, course_name = context_row
             
             # Формируем сообщение для студента
-            course_stmt = select(Course).where(Course.id == group.course_id)
-            course_result = await session.execute(course_stmt)
-            course = course_result.scalars().first()
-            course_name = course.name if course else "Неизвестный курс"
+            course_name = course_name or "Неизвестный курс"
             
             # Создаем приветственное сообщение с выбором анонимности
             welcome_message = "📊 <b>Приглашение к участию в опросе</b>\n\n"
@@ -467,8 +476,8 @@ async def initiate_survey_for_student(bot: Bot, dp: Dispatcher, student: Student
             
             # Создаем клавиатуру для выбора анонимности
             builder = InlineKeyboardBuilder()
-            builder.add(InlineKeyboardButton(text="🔒 Анонимно", callback_data="survey_anonymity:anonymous"))
-            builder.add(InlineKeyboardButton(text="👤 С указанием имени", callback_data="survey_anonymity:named"))
+            builder.add(InlineKeyboardButton(text="🔒 Анонимно", callback_data=SurveyAnonymityCB(choice="anonymous").pack()))
+            builder.add(InlineKeyboardButton(text="👤 С указанием имени", callback_data=SurveyAnonymityCB(choice="named").pack()))
             builder.adjust(1)  # Each button in separate row (full width)
         
         # Отправляем приветственное сообщение с выбором анонимности
@@ -480,13 +489,17 @@ async def initiate_survey_for_student(bot: Bot, dp: Dispatcher, student: Student
         
         # Устанавливаем состояние студента для выбора анонимности
         state = dp.fsm.get_context(bot, student.tg_user_id, student.tg_user_id)
+        # A survey still in progress is replaced; save its buffered answers first
+        await flush_buffered_answers(state, student.tg_user_id)
         await state.set_state(SurveyResponseStates.selecting_anonymity)
         await state.update_data(
             survey_id=survey_id,
             first_question_id=first_question.id,
             course_name=course_name,
-            group_name=group.name,
-            survey_title=survey.title
+            group_name=group_name,
+            survey_title=survey.title,
+            student_tg_username=student.tg_username,
+            questions=questions_snapshot
         )
         
         logger.info(f"Survey invitation sent to student '{student.tg_username}' (Telegram ID: {student.tg_user_id})")
@@ -22,7 +22,7 @@ from sqlmodel import (
     Field,
 )
 from sqlalchemy.ext.asyncio import create_async_engine
-from sqlalchemy import UniqueConstraint, Column, BigInteger, Text
+from sqlalchemy import UniqueConstraint, Index, Column, BigInteger, Boolean, Text, text
 from sqlalchemy.dialects.postgresql import TIMESTAMP
 
 # Import settings to access database_url
@@ -94,6 +94,8 @@ class GroupStudent(SQLModel, table=True):
 
 
 class Question(SQLModel, table=True):
+    # Also serves as the (survey_id, order) index for ordered question lookups
+    __table_args__ = (UniqueConstraint("survey_id", "order", name="uq_question_survey_id_order"),)
     id: Optional[int] = Field(default=None, primary_key=True)
     survey_id: int = Field(foreign_key="survey.id")
     text: str
@@ -116,6 +118,10 @@ class Survey(SQLModel, table=True):
 
 
 class Response(SQLModel, table=True):
+    # Lets the Sheets export find unexported rows without scanning the whole history
+    __table_args__ = (
+        Index("ix_response_sheets_pending", "id", postgresql_where=text("NOT sheets_exported")),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     survey_id: int = Field(index=True)
     student_tg_id: int = Field(sa_column=Column(BigInteger, index=True))
@@ -134,6 +140,11 @@ class Response(SQLModel, table=True):
         default=None,
         sa_column=Column(Text, nullable=True),
     )
+    # Set once the row has been appended to Google Sheets (see utils.sheets_sync)
+    sheets_exported: bool = Field(
+        default=False,
+        sa_column=Column(Boolean, nullable=False, server_default=text("false")),
+    )
 
 
 class Feedback(SQLModel, table=True):
@@ -153,7 +164,28 @@ class Feedback(SQLModel, table=True):
 # --------------------------------------------------------------------------- #
 # Engine helpers                                                              #
 # --------------------------------------------------------------------------- #
-async_engine = create_async_engine(DB_URL, echo=False)
+def _engine_options(url: str) -> dict:
+    """Engine kwargs; asyncpg gets a pool and server-side prepared statement caches."""
+    # Larger compiled-statement cache than the default 500 so hot handler queries stay compiled
+    options = {"echo": False, "query_cache_size": 1200}
+    if url.startswith("postgresql+asyncpg"):
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_pre_ping=settings.db_pool_pre_ping,
+            pool_recycle=settings.db_pool_recycle,
+            connect_args={
+                # SQLAlchemy's per-connection prepared statement cache / asyncpg's own cache
+                "prepared_statement_cache_size": 500,
+                "statement_cache_size": 500,
+                # statement_timeout in ms; JIT only adds planning overhead to the bot's short OLTP queries
+                "server_settings": {"statement_timeout": "30000", "jit": "off"},
+            },
+        )
+    return options
+
+
+async_engine = create_async_engine(DB_URL, **_engine_options(DB_URL))
 
 
 async def create_all_tables() -> None:
@@ -6,7 +6,7 @@ from aiogram.types import Message
 from sqlmodel import select
 from aiogram.fsm.context import FSMContext
 from aiogram import Bot
-from student_flow.survey_handlers import SurveyResponseStates
+from student_flow.survey_handlers import SurveyResponseStates, flush_buffered_answers
 from utils.auth_checks import get_user_role, set_commands_for_user
 
 from db import async_session
@@ -29,6 +29,7 @@ async def cmd_start(msg: Message, state: FSMContext, bot: Bot):
         state_name = current_state # Store state name before clearing
         logger.info(f"User {user_id} used /start, cancelling previous state: {state_name}")
         data = await state.get_data()
+        await flush_buffered_answers(state, user_id) # Save survey answers not yet written to the DB
         await state.clear() # Clear state first
         await msg.answer("(Предыдущая операция отменена)") # Generic cancellation message
         
@@ -1,4 +1,6 @@
 # student_flow/feedback_handlers.py
+from functools import lru_cache
+
 from aiogram import F, Router
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
@@ -6,7 +8,7 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message, ReplyKeyboardRemove, CallbackQuery, InlineKeyboardButton
 from aiogram import Bot
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from student_flow.survey_handlers import SurveyResponseStates
+from student_flow.survey_handlers import SurveyResponseStates, flush_buffered_answers
 from sqlmodel import select
 
 # Assuming db imports are needed here if feedback interacts with DB directly
@@ -30,12 +32,21 @@ from utils.constants import NO_COURSES_FOUND
 # Import the notification utility
 from utils.notifications import notify_curators_about_feedback
 
-# Initialize Google Sheets manager
-sheets_manager = GoogleSheetsManager(
-    creds_path=GOOGLE_SHEET_CREDENTIALS_PATH,
-    spreadsheet_url=GOOGLE_SHEETS_URL,
-    sheet_name=GOOGLE_SHEET_TAB_NAME
-)
+# Google Sheets manager, created on first use rather than at import; None if Sheets is unusable
+@lru_cache(maxsize=1)
+def get_sheets_manager() -> GoogleSheetsManager | None:
+    if not settings.sheets_enabled:
+        return None
+    try:
+        return GoogleSheetsManager(
+            creds_path=GOOGLE_SHEET_CREDENTIALS_PATH,
+            spreadsheet_url=GOOGLE_SHEETS_URL,
+            sheet_name=GOOGLE_SHEET_TAB_NAME
+        )
+    except ValueError as e:
+        logger.error(f"Google Sheets disabled for feedback, check GSHEET_URL: {e}")
+        return None
+
 
 # FSM States for Feedback
 class FeedbackStates(StatesGroup):
@@ -47,6 +58,14 @@ class FeedbackStates(StatesGroup):
 router = Router()
 
 
+@router.shutdown()
+async def flush_feedback_sheet() -> None:
+    """Writes feedback rows still buffered for Google Sheets."""
+    sheets_manager = get_sheets_manager()
+    if sheets_manager is not None:
+        await sheets_manager.close()
+
+
 # ----- Feedback flow ---------------------------------------------------------
 @router.message(Command("feedback"))
 async def feedback_begin(msg: Message, state: FSMContext, bot: Bot):
@@ -59,7 +78,8 @@ async def feedback_begin(msg: Message, state: FSMContext, bot: Bot):
         state_name = current_state # Store state name before clearing
         logger.info(f"User {user_id} used /feedback, cancelling previous state: {state_name}")
         data = await state.get_data()
-        last_msg_id = data.get("last_question_message_id") if state_name == SurveyResponseStates.awaiting_answer else None # Only get msg_id if it was survey state
+        last_msg_id = data.get("last_question_message_id") if state_name == SurveyResponseStates.answering else None # Only get msg_id if it was survey state
+        await flush_buffered_answers(state, user_id) # Save survey answers not yet written to the DB
         await state.clear() # Clear state first
         await msg.answer("(Предыдущая операция отменена)")
         if last_msg_id:
@@ -196,11 +216,10 @@ async def feedback_save(msg: Message, state: FSMContext, bot: Bot):
             "text": msg.text.strip()
         }
         
-        # Save to Google Sheets asynchronously
-        sheets_result = await sheets_manager.add_feedback(feedback_data)
-        if not sheets_result:
-            logger.error(f"Failed to save feedback to Google Sheets for user {user_id}")
-            # We don't notify the user of this error since the DB save was successful
+        # Queue for Google Sheets; rows are appended in batches and the DB stays the source of truth
+        sheets_manager = get_sheets_manager()
+        if sheets_manager is not None:
+            await sheets_manager.add_feedback(feedback_data)
         
         # Send notification to curators of this course
         try:
@@ -1,35 +1,62 @@
 # student_flow/survey_handlers.py
+import asyncio
 import logging
 import uuid
-from aiogram import F, Router, Bot
+from aiogram import F, Router, Bot, Dispatcher
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import Message, CallbackQuery, ReplyKeyboardRemove
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 from datetime import datetime, timezone
 
 from db import async_session
 from models import Student, Response, Question, QuestionType, Group, Course, Survey
-# Import the keyboard functions we might need
-from utils.keyboards import get_scale_keyboard, get_skip_keyboard
-# Import Google Sheets functionality
-from utils.sheets import GoogleSheetsManager
-from config import settings
+# Prebuilt answer keyboards
+from utils.keyboards import SCALE_MARKUP, SKIP_MARKUP
+from utils.callback_data import SurveyAnswerCB, SurveyAnonymityCB
+# Periodic DB -> Google Sheets export
+from utils.sheets_sync import start_sheets_sync, stop_sheets_sync
 
 logger = logging.getLogger(__name__)
 router = Router()
 
-# Initialize Google Sheets manager for survey responses
-sheets_manager = GoogleSheetsManager(
-    creds_path=settings.google_credentials_path,
-    spreadsheet_url=settings.surveys_gsheet_url,
-    sheet_name=settings.surveys_gsheet_tab_name
-)
-
 # Constant for skipped answers
 SKIPPED_ANSWER = "[SKIPPED]"
 
+# Number of buffered answers that triggers a DB flush (the rest is flushed on survey completion)
+RESPONSE_FLUSH_BATCH_SIZE = 3
+
+# Strong references to fire-and-forget tasks so they aren't garbage-collected mid-flight
+_background_tasks: set[asyncio.Task] = set()
+
+def _run_in_background(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+async def _safe_callback_answer(callback: CallbackQuery, text: str) -> None:
+    try:
+        await callback.answer(text, show_alert=False)
+    except Exception as e:
+        logger.warning(f"Could not answer callback for user {callback.from_user.id}: {e}")
+
+# ----- Google Sheets export -----
+# Responses reach Sheets through the periodic DB export in utils.sheets_sync,
+# so answer handlers never wait on (or spend quota with) the Sheets API.
+@router.startup()
+async def on_startup() -> None:
+    await start_sheets_sync()
+
+@router.shutdown()
+async def on_shutdown(dispatcher: Dispatcher) -> None:
+    # Buffered answers go to the DB first so the final export picks them up
+    await flush_all_buffered_answers(dispatcher)
+    await stop_sheets_sync()
+
 # ----- FSM States for Student receiving survey -----
 class SurveyResponseStates(StatesGroup):
     selecting_anonymity = State()
@@ -38,100 +65,140 @@ class SurveyResponseStates(StatesGroup):
 # ----- Helper: Get Student ID -----
 async def get_student_id(user_id: int) -> int | None:
     async with async_session() as session:
-        result = await session.execute(select(Student.id).where(Student.tg_user_id == user_id))
-        student_id = result.scalars().first()
+        student_id = await session.scalar(select(Student.id).where(Student.tg_user_id == user_id))
         if not student_id:
             logger.error(f"Could not find Student record for user_id {user_id} while processing survey response.")
         return student_id
 
-# ----- Helper: Save Response -----
-async def save_response(state: FSMContext, user_id: int, answer_text: str):
+# ----- Helper: Flush Buffered Responses -----
+_RESPONSE_COPY_COLUMNS = (
+    "survey_id", "student_tg_id", "student_tg_username", "course_name", "group_name",
+    "survey_title", "question_text", "question_type", "answer", "answered_at", "session_id",
+)
+
+async def _copy_responses(session: AsyncSession, pending: list[dict]) -> None:
+    """Streams buffered responses into Postgres with COPY over the session's asyncpg connection."""
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    # question_type is already the plain enum value string (see the question snapshot)
+    records = [tuple(fields[column] for column in _RESPONSE_COPY_COLUMNS) for fields in pending]
+    await raw_connection.driver_connection.copy_records_to_table(
+        Response.__tablename__, records=records, columns=_RESPONSE_COPY_COLUMNS
+    )
+
+async def flush_pending_responses(state: FSMContext, data: dict, user_id: int, session: AsyncSession) -> bool:
+    """Writes all responses buffered in FSM state to the DB in a single transaction."""
+    pending = data.get("pending_responses") or []
+    if not pending:
+        return True
+
+    try:
+        if session.bind.dialect.driver == "asyncpg":
+            await _copy_responses(session, pending)
+        else:
+            # Core INSERT (executemany) skips ORM instance construction and unit-of-work bookkeeping
+            await session.execute(insert(Response), pending)
+        await session.commit()
+    except Exception as e:
+        logger.exception(f"Failed to flush {len(pending)} buffered responses for survey {data.get('survey_id')}, user {user_id}: {e}")
+        await session.rollback()
+        return False
+
+    data["pending_responses"] = []
+    # Persist the cleared buffer right away so a later failure can't re-insert these rows
+    await state.update_data(pending_responses=[])
+    logger.debug("Flushed %d responses for survey %s, user %s.", len(pending), data.get("survey_id"), user_id)
+    return True
+
+async def flush_buffered_answers(state: FSMContext, user_id: int) -> bool:
+    """Saves answers still buffered in state; call before clearing or overwriting a survey context."""
     data = await state.get_data()
+    pending = data.get("pending_responses")
+    if not pending:
+        return True
+    async with async_session() as session:
+        if await flush_pending_responses(state, data, user_id, session):
+            return True
+    # Keep the rows in the log so they can be restored by hand if the state is cleared
+    logger.error(f"Unsaved survey responses for survey {data.get('survey_id')}, user {user_id}: {pending}")
+    return False
+
+async def flush_all_buffered_answers(dispatcher: Dispatcher) -> None:
+    """Saves every in-progress buffer; MemoryStorage loses them when the bot stops."""
+    storage = dispatcher.storage
+    if not isinstance(storage, MemoryStorage):
+        return
+    for key, record in list(storage.storage.items()):
+        if record.data.get("pending_responses"):
+            await flush_buffered_answers(FSMContext(storage=storage, key=key), key.user_id)
+
+# ----- Helper: Validate Answer Context -----
+def has_answer_context(data: dict, user_id: int) -> bool:
+    """Checks that the FSM state can record an answer; called before a DB session is opened."""
+    if not data.get("survey_id") or not data.get("current_question_id") or not data.get("questions"):
+        logger.error(f"Missing survey_id/question_id/questions in state for user {user_id} during save_response")
+        return False
+    return True
+
+# ----- Helper: Save Response -----
+async def save_response(data: dict, user_id: int, answer_text: str) -> bool:
+    """Buffers the answer in `data`; DB writes happen in flush_pending_responses."""
     survey_id = data.get("survey_id")
     question_id = data.get("current_question_id")
+    question_order = data.get("question_order", 1)
     survey_title = data.get("survey_title", "")
     course_name = data.get("course_name", "")
     group_name = data.get("group_name", "")
-    question_type = data.get("question_type")
     is_anonymous = data.get("is_anonymous", False)
     session_id = data.get("session_id")
-    
-    # Ensure all necessary context is present
-    if not survey_id or not question_id:
-        logger.error(f"Missing survey_id/question_id in state for user {user_id} during save_response")
-        return False # Indicate failure
+    # Pure-Python prep happens before any DB access so the connection isn't held for it
+    # The skip sentinel is already clean; identity check avoids a needless strip()
+    answer_clean = answer_text if answer_text is SKIPPED_ANSWER else answer_text.strip()
 
-    async with async_session() as session:
-        try:
-            # Fetch student username first
-            student_result = await session.execute(select(Student).where(Student.tg_user_id == user_id))
-            student = student_result.scalars().first()
-            
-            if is_anonymous:
-                student_username = "Аноним"
-                display_username = "Аноним"
-                stored_user_id = 0  # Store 0 for anonymous
-            else:
-                student_username = student.tg_username if student else f"[Unknown User ID: {user_id}]"
-                display_username = student_username
-                stored_user_id = user_id
-                
-            if not student and not is_anonymous:
-                 logger.error(f"Cannot find Student with tg_user_id {user_id} for survey {survey_id}. Aborting response save.")
-                 return False
-
-            # Fetch the question to get its text
-            question = await session.get(Question, question_id)
-            if not question:
-                logger.error(f"Cannot find Question {question_id} for survey {survey_id}, user {user_id}. Aborting response save.")
-                return False
-
-            # Create the denormalized Response object
-            new_response = Response(
-                survey_id=survey_id,
-                student_tg_id=stored_user_id,
-                student_tg_username=student_username,
-                course_name=course_name,
-                group_name=group_name,
-                survey_title=survey_title,
-                question_text=question.text,
-                question_type=question_type or question.q_type,
-                answer=answer_text.strip(),
-                session_id=session_id or ""
-                # answered_at is handled by default_factory
-            )
-            session.add(new_response)
-            await session.commit()
-            logger.info(f"Saved response for survey {survey_id} '{survey_title}', user {user_id}, question ID {question_id}.")
-            
-            # After successful DB save, also save to Google Sheets
-            response_data = {
-                "timestamp": new_response.answered_at,
-                "student_username": display_username,
-                "course_name": course_name,
-                "group_name": group_name,
-                "survey_title": survey_title,
-                "question_text": question.text,
-                "question_type": question_type.value if hasattr(question_type, 'value') else str(question_type),
-                "answer": answer_text.strip(),
-                "session_id": session_id 
-            }
-            
-            # Save to Google Sheets asynchronously
-            sheets_result = await sheets_manager.add_survey_response(response_data)
-            if not sheets_result:
-                logger.error(f"Failed to save survey response to Google Sheets for user {user_id}")
-                # We don't notify the user of this error since the DB save was successful
-            
-            return True # Indicate success
-        except Exception as e:
-            logger.exception(f"Failed to save response for survey {survey_id}, user {user_id}, question {question_id}: {e}")
-            await session.rollback()
-            return False # Indicate failure
+    if is_anonymous:
+        student_username = "Аноним"
+        stored_user_id = 0  # Store 0 for anonymous
+    else:
+        # Snapshotted into state when the survey started
+        student_username = data.get("student_tg_username")
+        if student_username is None:
+            logger.error(f"Missing student username in state for user {user_id}, survey {survey_id}. Aborting response save.")
+            return False
+        stored_user_id = user_id
+
+    # Question text/type come from the snapshot taken when the survey was started
+    question = data["questions"][question_order - 1]
+    question_type = question["q_type"]
+
+    # Buffer the denormalized Response fields; they are written in batches by flush_pending_responses
+    answered_at = datetime.now(timezone.utc)
+    pending = (data.get("pending_responses") or []) + [dict(
+        survey_id=survey_id,
+        student_tg_id=stored_user_id,
+        student_tg_username=student_username,
+        course_name=course_name,
+        group_name=group_name,
+        survey_title=survey_title,
+        question_text=question["text"],
+        question_type=question_type,
+        answer=answer_clean,
+        answered_at=answered_at,
+        session_id=session_id or ""
+    )]
+    # Kept in `data` only; send_next_question_or_complete writes the state back once
+    data["pending_responses"] = pending
+    # Per-answer logs are DEBUG with lazy %-args: nothing is formatted unless DEBUG is enabled
+    logger.debug("Buffered response for survey %s '%s', user %s, question ID %s.", survey_id, survey_title, user_id, question_id)
+
+    return True # Indicate success
 
 # ----- Helper: Send Next Question or Complete -----
-async def send_next_question_or_complete(bot: Bot, state: FSMContext, user_id: int):
-    data = await state.get_data()
+async def send_next_question_or_complete(bot: Bot, state: FSMContext, data: dict, user_id: int, session: AsyncSession, message_id: int | None = None):
+    """Sends the next question, or finishes the survey.
+
+    When `message_id` (the previous question message) is given it is edited in place,
+    which costs one Telegram call instead of a new message per question.
+    """
     survey_id = data.get("survey_id")
     question_order = data.get("question_order", 1)
     survey_title = data.get("survey_title", "")
@@ -140,68 +207,124 @@ async def send_next_question_or_complete(bot: Bot, state: FSMContext, user_id: i
     if survey_id is None or question_order is None:
         logger.error(f"Missing survey_id or question_order in state for user {user_id} during send_next_question")
         await bot.send_message(user_id, "Произошла ошибка при получении следующего вопроса. Пожалуйста, свяжитесь с куратором.")
+        await flush_buffered_answers(state, user_id)
         await state.clear()
         return
         
     next_order = question_order + 1
     
-    async with async_session() as session:
-        stmt = select(Question).where(
-            Question.survey_id == survey_id,
-            Question.order == next_order
-        ).order_by(Question.order) # Ensure order just in case
-        result = await session.execute(stmt)
-        next_question: Question | None = result.scalars().first()
+    # Questions are 1-based by order and were snapshotted when the survey was started
+    questions = data.get("questions") or []
+    next_question = questions[next_order - 1] if next_order <= len(questions) else None
         
     if next_question:
         # Send next question
-        question_text = next_question.text
+        question_text = next_question["text"]
         
         # Create message text with survey title and course name
         message_text = f"📊 <b>Опрос '{survey_title}' по курсу '{course_name}'</b>\n\n<b>Вопрос {next_order}:</b> {question_text}"
         
         # Select keyboard based on question type
-        if next_question.q_type == QuestionType.scale:
-            keyboard = get_scale_keyboard()
+        if next_question["q_type"] == QuestionType.scale:
+            reply_markup = SCALE_MARKUP
             message_text += "\n\nОцените по шкале от 1 до 10:"
         else: # Text question
-            keyboard = get_skip_keyboard()
+            reply_markup = SKIP_MARKUP
             message_text += "\n\nВведите ваш ответ или нажмите «Пропустить»:"
             
-        # Send the message
-        sent_message = await bot.send_message(
-            chat_id=user_id, 
-            text=message_text,
-            reply_markup=keyboard.as_markup()
-        )
+        if message_id:
+            await bot.edit_message_text(
+                text=message_text,
+                chat_id=user_id,
+                message_id=message_id,
+                reply_markup=reply_markup
+            )
+        else:
+            await bot.send_message(
+                chat_id=user_id, 
+                text=message_text,
+                reply_markup=reply_markup
+            )
         
-        # Update state for the next question
-        await state.update_data(
-            current_question_id=next_question.id,
-            question_type=next_question.q_type,
+        # Update state for the next question with a single storage write
+        data.update(
+            current_question_id=next_question["id"],
             question_order=next_order
         )
-        logger.info(f"Sent question {next_order} (ID: {next_question.id}) to user {user_id}.")
+        await state.set_data(data)
+        logger.debug("Sent question %s (ID: %s) to user %s.", next_order, next_question["id"], user_id)
     else:
-        await bot.send_message(user_id, f"Спасибо! Опрос '{survey_title}' завершен. ✅", reply_markup=ReplyKeyboardRemove())
+        if not await flush_pending_responses(state, data, user_id, session):
+            # Keep the buffer in state; the student's next answer or button press retries the write
+            data["completion_pending"] = True
+            await state.set_data(data)
+            await bot.send_message(user_id, "Произошла ошибка при сохранении ваших ответов. Отправьте любое сообщение или нажмите кнопку, чтобы повторить попытку.")
+            return
+        completion_text = f"Спасибо! Опрос '{survey_title}' завершен. ✅"
+        if message_id:
+            await bot.edit_message_text(text=completion_text, chat_id=user_id, message_id=message_id)
+        else:
+            await bot.send_message(user_id, completion_text, reply_markup=ReplyKeyboardRemove())
         await state.clear()
-        logger.info(f"Survey completed for user {user_id} (last question order: {question_order})")
+        logger.debug("Survey completed for user %s (last question order: %s)", user_id, question_order)
+
+# ----- Helper: Process Answer -----
+async def process_answer(
+    bot: Bot,
+    state: FSMContext,
+    user_id: int,
+    answer_text: str,
+    callback: CallbackQuery | None = None,
+    saved_notice: str | None = None,
+) -> bool:
+    """Records an answer and moves the student on to the next question.
+
+    For button answers pass the `callback`: its message is edited into the next question
+    and `saved_notice` is shown as a toast. Returns False if the answer could not be saved.
+    """
+    data = await state.get_data()
+    if not has_answer_context(data, user_id):
+        return False
+
+    message_id = callback.message.message_id if callback is not None else None
+    if data.get("completion_pending"):
+        # Every answer is already buffered; only the final write is retried
+        if callback is not None:
+            _run_in_background(_safe_callback_answer(callback, "Сохраняем ответы..."))
+        async with async_session() as session:
+            await send_next_question_or_complete(bot, state, data, user_id, session, message_id)
+        return True
+
+    if not await save_response(data, user_id, answer_text):
+        return False
+    if callback is not None:
+        # Let the user know their answer was recorded without blocking the next question
+        if saved_notice:
+            _run_in_background(_safe_callback_answer(callback, saved_notice))
+
+    is_last_question = data.get("question_order", 1) >= len(data["questions"])
+    flush_due = len(data["pending_responses"]) >= RESPONSE_FLUSH_BATCH_SIZE
+
+    # One session for the whole answer (batch flush, completion)
+    async with async_session() as session:
+        # The completion path flushes everything itself before thanking the student
+        await send_next_question_or_complete(bot, state, data, user_id, session, message_id)
+        # Flush only after the next question went out and the state was advanced with
+        # the buffer, so a failed send can't leave written rows to be answered again
+        if flush_due and not is_last_question:
+            if not await flush_pending_responses(state, data, user_id, session):
+                # The batch stays buffered in state and is retried on the next flush or at completion
+                logger.warning(f"Deferred flush of buffered responses for survey {data.get('survey_id')}, user {user_id}")
+    return True
 
 # ----- Handlers -----
 
 # Handler for anonymity selection in surveys
-@router.callback_query(SurveyResponseStates.selecting_anonymity, F.data.startswith("survey_anonymity:"))
-async def handle_survey_anonymity_selection(callback: CallbackQuery, state: FSMContext, bot: Bot):
+@router.callback_query(SurveyResponseStates.selecting_anonymity, SurveyAnonymityCB.filter())
+async def handle_survey_anonymity_selection(callback: CallbackQuery, callback_data: SurveyAnonymityCB, state: FSMContext, bot: Bot):
     """Handles anonymity selection and starts the survey."""
-    try:
-        anonymity_choice = callback.data.split(":")[1]
-    except (IndexError, ValueError):
-        await callback.answer("Ошибка при выборе анонимности.", show_alert=True)
-        await state.clear()
-        return
-
     user_id = callback.from_user.id
-    is_anonymous = (anonymity_choice == "anonymous")
+    is_anonymous = (callback_data.choice == "anonymous")
     
     # Get survey data from state
     data = await state.get_data()
@@ -217,39 +340,64 @@ async def handle_survey_anonymity_selection(callback: CallbackQuery, state: FSMC
         await state.clear()
         return
     
-    async with async_session() as session:
-        # Get the first question
-        first_question = await session.get(Question, first_question_id)
-        if not first_question:
-            await callback.message.edit_text("Ошибка: Первый вопрос не найден.")
-            await callback.answer()
-            await state.clear()
-            return
+    # The invitation normally carries the question snapshot and the username;
+    # only fall back to the DB (once per survey) when they are missing
+    questions = data.get("questions")
+    student_tg_username = data.get("student_tg_username")
+    if questions is None or (not is_anonymous and student_tg_username is None):
+        async with async_session() as session:
+            if questions is None:
+                result = await session.execute(
+                    select(Question.id, Question.text, Question.q_type)
+                    .where(Question.survey_id == survey_id)
+                    .order_by(Question.order)
+                )
+                # q_type is stored as its plain string value so state stays JSON-friendly
+                questions = [{"id": q_id, "text": text, "q_type": q_type.value} for q_id, text, q_type in result]
+
+            if not is_anonymous and student_tg_username is None:
+                student_tg_username = await session.scalar(
+                    select(Student.tg_username).where(Student.tg_user_id == user_id)
+                )
+                if student_tg_username is None:
+                    logger.error(f"Cannot find Student with tg_user_id {user_id} for survey {survey_id}.")
+                    await callback.message.edit_text("Ошибка: Студент не найден. Попробуйте /start и дождитесь нового опроса.")
+                    await callback.answer()
+                    await state.clear()
+                    return
+
+    if not questions:
+        await callback.message.edit_text("Ошибка: Первый вопрос не найден.")
+        await callback.answer()
+        await state.clear()
+        return
+    first_question = questions[0]
     
     # Create message text with survey info
     anonymity_text = "анонимно" if is_anonymous else "с указанием имени"
     await callback.answer(f"Вы будете проходить опрос {anonymity_text}")
     
-    message_text = f"📊 <b>Опрос '{survey_title}' по курсу '{course_name}'</b>\n\n<b>Вопрос 1:</b> {first_question.text}"
+    message_text = f"📊 <b>Опрос '{survey_title}' по курсу '{course_name}'</b>\n\n<b>Вопрос 1:</b> {first_question['text']}"
     
     # Select keyboard based on question type
-    if first_question.q_type == QuestionType.scale:
-        keyboard = get_scale_keyboard()
+    if first_question["q_type"] == QuestionType.scale:
+        reply_markup = SCALE_MARKUP
         message_text += "\n\nОцените по шкале от 1 до 10:"
     else: # Text question
-        keyboard = get_skip_keyboard()
+        reply_markup = SKIP_MARKUP
         message_text += "\n\nВведите ваш ответ или нажмите «Пропустить»:"
     
     # Edit the message to show the first question
-    await callback.message.edit_text(message_text, reply_markup=keyboard.as_markup())
+    await callback.message.edit_text(message_text, reply_markup=reply_markup)
     
     # Update state for the first question
     await state.set_state(SurveyResponseStates.answering)
 
     session_id = str(uuid.uuid4())
     await state.update_data(
-        current_question_id=first_question_id,
-        question_type=first_question.q_type,
+        questions=questions,
+        student_tg_username=student_tg_username,
+        current_question_id=first_question["id"],
         question_order=1,
         is_anonymous=is_anonymous,
         session_id=session_id
@@ -257,45 +405,28 @@ async def handle_survey_anonymity_selection(callback: CallbackQuery, state: FSMC
     logger.info(f"Survey started for user {user_id} (anonymous: {is_anonymous})")
 
 # Handler for SCALE answers (Callback Query)
-@router.callback_query(SurveyResponseStates.answering, F.data.startswith("survey_answer:"))
-async def handle_scale_answer(callback: CallbackQuery, state: FSMContext, bot: Bot):
-    try:
-        answer = callback.data.split(":")[1]
-        user_id = callback.from_user.id
-        
-        # Attempt to save the response
-        if await save_response(state, user_id, answer):
-            # Let the user know their answer was recorded
-            await callback.answer("Ответ записан", show_alert=False)
-            # Send the next question or complete
-            await send_next_question_or_complete(bot, state, user_id)
-        else:
-            # Saving failed (error already logged), inform user and clear state
-            await callback.message.edit_text("Произошла ошибка при сохранении вашего ответа. Попробуйте позже или свяжитесь с куратором.", reply_markup=None)
-            await state.clear()
-            await callback.answer("Ошибка сохранения", show_alert=True)
-    except (IndexError, ValueError):
-        logger.warning(f"Invalid callback data received for scale answer: {callback.data}")
-        await callback.answer("Ошибка: Некорректный ответ.", show_alert=True)
+@router.callback_query(SurveyResponseStates.answering, SurveyAnswerCB.filter())
+async def handle_scale_answer(callback: CallbackQuery, callback_data: SurveyAnswerCB, state: FSMContext, bot: Bot):
+    answer = str(callback_data.value)
+    if not await process_answer(bot, state, callback.from_user.id, answer, callback, "Ответ записан"):
+        # Saving failed (error already logged), inform user and clear state
+        await callback.message.edit_text("Произошла ошибка при сохранении вашего ответа. Попробуйте позже или свяжитесь с куратором.", reply_markup=None)
+        await flush_buffered_answers(state, callback.from_user.id)
+        await state.clear()
+        await callback.answer("Ошибка сохранения", show_alert=True)
 
 # Handler for SKIP button (Callback Query)
 @router.callback_query(SurveyResponseStates.answering, F.data == "survey_action:skip")
 async def handle_skip_button(callback: CallbackQuery, state: FSMContext, bot: Bot):
-    user_id = callback.from_user.id
-    
-    if await save_response(state, user_id, SKIPPED_ANSWER):
-        await callback.answer("Вопрос пропущен", show_alert=False)
-        # Send next question or complete
-        await send_next_question_or_complete(bot, state, user_id)
-    else:
+    if not await process_answer(bot, state, callback.from_user.id, SKIPPED_ANSWER, callback, "Вопрос пропущен"):
         await callback.message.edit_text("Произошла ошибка при обработке пропуска. Попробуйте позже или свяжитесь с куратором.", reply_markup=None)
+        await flush_buffered_answers(state, callback.from_user.id)
         await state.clear()
         await callback.answer("Ошибка обработки", show_alert=True)
 
 # Handler for TEXT answers (Messages)
 @router.message(SurveyResponseStates.answering, F.text)
 async def handle_text_answer(message: Message, state: FSMContext, bot: Bot):
-    user_id = message.from_user.id
     answer_text = message.text
     
     # Make sure this is a valid answer (not empty, not a command)
@@ -303,21 +434,15 @@ async def handle_text_answer(message: Message, state: FSMContext, bot: Bot):
         await message.answer("Пожалуйста, введите текстовый ответ или нажмите кнопку «Пропустить».")
         return
     
-    if await save_response(state, user_id, answer_text):
-        # Send next question or complete
-        await send_next_question_or_complete(bot, state, user_id)
-    else:
+    if not await process_answer(bot, state, message.from_user.id, answer_text):
         await message.answer("Произошла ошибка при сохранении вашего ответа. Попробуйте позже или свяжитесь с куратором.")
+        await flush_buffered_answers(state, message.from_user.id)
         await state.clear()
 
 # Handler for /skip command as alternative to button
 @router.message(SurveyResponseStates.answering, Command("skip"))
 async def handle_skip_command(message: Message, state: FSMContext, bot: Bot):
-    user_id = message.from_user.id
-    
-    if await save_response(state, user_id, SKIPPED_ANSWER):
-        # Send next question or complete
-        await send_next_question_or_complete(bot, state, user_id)
-    else:
+    if not await process_answer(bot, state, message.from_user.id, SKIPPED_ANSWER):
         await message.answer("Произошла ошибка при обработке пропуска. Попробуйте позже или свяжитесь с куратором.")
-        await state.clear() 
\ No newline at end of file
+        await flush_buffered_answers(state, message.from_user.id)
+        await state.clear()
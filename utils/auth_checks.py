@@ -15,67 +15,53 @@ logger = logging.getLogger(__name__)
 # ----- Admin Check ----- 
 def is_admin(uid: int, uname: Optional[str]) -> bool:
     """Checks if a user ID or username is in the admin set."""
-    admin_set = settings.admin_id_set
-    logger.info(
-        f"Checking admin access: user_id={uid}, username='{uname}', admin_set={admin_set}"
-    )
-    if uid in admin_set:
-        logger.info(f"Admin access check result (by ID): True")
+    if uid in settings.admin_ids:
         return True
-    if uname:
-        plain_uname_lower = uname.lower()
-        at_uname_lower = f"@{plain_uname_lower}"
-        # Check both with and without @, case-insensitive
-        if plain_uname_lower in admin_set or at_uname_lower in admin_set:
-            logger.info(f"Admin access check result (by Username '{uname}'): True")
-            return True
-    logger.info(f"Admin access check result: False")
-    return False
+    return bool(uname) and uname.lower().lstrip('@') in settings.admin_usernames
 
 def admin_guard(handler):
     """Decorator to restrict access to admin-only handlers."""
     handler_params = inspect.signature(handler).parameters
+    # Resolved once at decoration time instead of on every call
+    needs_msg = 'msg' in handler_params
+    needs_command = 'command' in handler_params
+    needs_state = 'state' in handler_params
+    handler_name = handler.__name__
 
     async def wrapper(msg: Message, *args, **kwargs):
         user = msg.from_user
-        logger.debug(f"Admin guard activated for {handler.__name__} by user_id={user.id}, username='{user.username}'")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Admin guard activated for {handler_name} by user_id={user.id}, username='{user.username}'")
         if not is_admin(user.id, user.username):
             logger.warning(
-                f"Access denied by admin_guard for {handler.__name__}: user_id={user.id}, username='{user.username}'"
+                f"Access denied by admin_guard for {handler_name}: user_id={user.id}, username='{user.username}'"
             )
             await msg.answer("⛔️ Access denied (Admin only)")
             return
-        logger.info(
-            f"Access granted by admin_guard for {handler.__name__}: user_id={user.id}, username='{user.username}'"
-        )
 
         # Prepare args based *only* on what the handler expects
-        final_kwargs = {}
-        if 'msg' in handler_params:
-            final_kwargs['msg'] = msg
-        if 'command' in handler_params:
+        final_kwargs = {'msg': msg} if needs_msg else {}
+        if needs_command:
             command = kwargs.get('command')
-            if command is not None:
-                final_kwargs['command'] = command
-            else:
-                logger.error(f"Handler {handler.__name__} expects 'command' but not found in kwargs")
+            if command is None:
+                logger.error(f"Handler {handler_name} expects 'command' but not found in kwargs")
                 await msg.answer("Error: Missing command arguments.")
                 return
-        if 'state' in handler_params:
+            final_kwargs['command'] = command
+        if needs_state:
             state_arg = kwargs.get('state') # Get state from aiogram's kwargs
-            if state_arg is not None:
-                final_kwargs['state'] = state_arg
-            else:
+            if state_arg is None:
                 # This shouldn't happen if aiogram passes state correctly
-                logger.error(f"Handler {handler.__name__} expects 'state' but not found in kwargs")
+                logger.error(f"Handler {handler_name} expects 'state' but not found in kwargs")
                 await msg.answer("Internal error: State context missing.")
                 return
+            final_kwargs['state'] = state_arg
 
         try:
             # Call handler only with arguments defined in its signature
             return await handler(**final_kwargs)
         except Exception as e:
-            logger.exception(f"Error calling handler {handler.__name__} from admin_guard: {e}")
+            logger.exception(f"Error calling handler {handler_name} from admin_guard: {e}")
             await msg.answer("An internal error occurred.")
             return
 
@@ -97,34 +83,42 @@ async def get_user_role(user_id: int, username: str | None) -> str:
                 return "curator"
     return "student" 
 
+# ----- Per-role command menus -----
+STUDENT_COMMANDS = [
+    BotCommand(command="start", description="Начать/Перезапустить бота"),
+    BotCommand(command="help", description="Показать справку"),
+    BotCommand(command="feedback", description="Отправить отзыв"),
+]
+CURATOR_COMMANDS = STUDENT_COMMANDS + [
+    BotCommand(command="set_group", description="Создать группу"),
+    BotCommand(command="list_groups", description="Список групп для курса"),
+    BotCommand(command="set_recipients", description="Задать состав группы"),
+    BotCommand(command="set_questions", description="Задать вопросы для опроса"),
+    BotCommand(command="send_now", description="Отправить опрос группе"),
+]
+ADMIN_COMMANDS = CURATOR_COMMANDS + [
+    BotCommand(command="list_courses", description="Список всех курсов"),
+    BotCommand(command="create_course", description="Создать новый курс"),
+    BotCommand(command="delete_course", description="Удалить курс"),
+    BotCommand(command="add_curator", description="Добавить куратора к курсу"),
+]
+
+# Role whose menu was last pushed to each chat; lets repeat /start calls skip the Telegram API
+_last_role_by_user: dict[int, str] = {}
+
 async def set_commands_for_user(bot, user_id: int, role: str):
-    student_cmds = [
-        BotCommand(command="start", description="Начать/Перезапустить бота"),
-        BotCommand(command="help", description="Показать справку"),
-        BotCommand(command="feedback", description="Отправить отзыв"),
-    ]
-    curator_cmds = student_cmds + [
-        BotCommand(command="set_group", description="Создать группу"),
-        BotCommand(command="list_groups", description="Список групп для курса"),
-        BotCommand(command="set_recipients", description="Задать состав группы"),
-        BotCommand(command="set_questions", description="Задать вопросы для опроса"),
-        BotCommand(command="send_now", description="Отправить опрос группе"),
-    ]
-    admin_cmds = curator_cmds + [
-        BotCommand(command="list_courses", description="Список всех курсов"),
-        BotCommand(command="create_course", description="Создать новый курс"),
-        BotCommand(command="delete_course", description="Удалить курс"),
-        BotCommand(command="add_curator", description="Добавить куратора к курсу"),
-    ]
+    if _last_role_by_user.get(user_id) == role:
+        return
 
     if role == "admin":
-        commands = admin_cmds
+        commands = ADMIN_COMMANDS
     elif role == "curator":
-        commands = curator_cmds
+        commands = CURATOR_COMMANDS
     else:
-        commands = student_cmds
+        commands = STUDENT_COMMANDS
 
     await bot.set_my_commands(
         commands=commands,
         scope=BotCommandScopeChat(chat_id=user_id)
-    ) 
\ No newline at end of file
+    )
+    _last_role_by_user[user_id] = role
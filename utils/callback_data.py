@@ -0,0 +1,21 @@
+"""
+utils/callback_data.py
+~~~~~~~~~~~~~~~~~~~~~~
+
+Typed callback-data factories for the student survey buttons.
+
+aiogram parses these once during filter dispatch, so handlers receive a typed
+object instead of splitting `callback.data` themselves. The packed strings
+("survey_answer:7", "survey_anonymity:named") match the old hand-built ones,
+so buttons on messages sent before an upgrade keep working.
+"""
+
+from aiogram.filters.callback_data import CallbackData
+
+
+class SurveyAnswerCB(CallbackData, prefix="survey_answer"):
+    value: int
+
+
+class SurveyAnonymityCB(CallbackData, prefix="survey_anonymity"):
+    choice: str  # "anonymous" or "named"
@@ -5,6 +5,7 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 from sqlmodel import select
 
 from db import async_session
+from utils.callback_data import SurveyAnswerCB
 from models import Course, Group
 
 
@@ -107,7 +108,7 @@ def get_question_type_keyboard(current_question_count: int, max_questions: int)
 def get_scale_keyboard() -> InlineKeyboardBuilder:
     """Creates the keyboard for scale (1-10) questions."""
     builder = InlineKeyboardBuilder()
-    buttons = [InlineKeyboardButton(text=str(i), callback_data=f"survey_answer:{i}") for i in range(1, 11)]
+    buttons = [InlineKeyboardButton(text=str(i), callback_data=SurveyAnswerCB(value=i).pack()) for i in range(1, 11)]
     # Arrange buttons (e.g., 5 per row)
     builder.row(*buttons[:5])
     builder.row(*buttons[5:])
@@ -120,4 +121,10 @@ def get_skip_keyboard() -> InlineKeyboardBuilder:
     """Creates a keyboard with only a Skip button."""
     builder = InlineKeyboardBuilder()
     builder.row(InlineKeyboardButton(text="Пропустить", callback_data="survey_action:skip"))
-    return builder 
\ No newline at end of file
+    return builder
+
+
+# The answer keyboards never change, so their markups are built once at import
+# and shared by every question message.
+SCALE_MARKUP = get_scale_keyboard().as_markup()
+SKIP_MARKUP = get_skip_keyboard().as_markup()
@@ -4,12 +4,17 @@ logging_config.py
 Advanced logging configuration with daily rotating log files.
 """
 
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
 from datetime import datetime
 from pathlib import Path
 
+# Set once setup_logging has installed handlers; repeat calls return the existing logger
+_CONFIGURED = False
+
 
 def setup_logging(log_level=logging.INFO, log_dir="logs", console_output=False):
     """
@@ -20,6 +25,10 @@ def setup_logging(log_level=logging.INFO, log_dir="logs", console_output=False):
         log_dir: Directory to store log files (default: "logs")
         console_output: Whether to also output logs to console (default: False)
     """
+    global _CONFIGURED
+    if _CONFIGURED:
+        return logging.getLogger("feedback_bot")
+
     # Create logs directory if it doesn't exist
     log_path = Path(log_dir)
     log_path.mkdir(exist_ok=True)
@@ -34,15 +43,20 @@ def setup_logging(log_level=logging.INFO, log_dir="logs", console_output=False):
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
     
-    # Clear any existing handlers
+    # Close and clear any existing handlers so their file descriptors aren't leaked
+    for handler in root_logger.handlers:
+        handler.close()
     root_logger.handlers.clear()
     
+    # Output handlers run on a QueueListener thread, so the event loop never blocks on I/O
+    output_handlers = []
+    
     # Console handler (optional)
     if console_output:
         console_handler = logging.StreamHandler()
         console_handler.setLevel(log_level)
         console_handler.setFormatter(formatter)
-        root_logger.addHandler(console_handler)
+        output_handlers.append(console_handler)
     
     # Daily rotating file handler
     today = datetime.now().strftime("%Y-%m-%d")
@@ -62,19 +76,32 @@ def setup_logging(log_level=logging.INFO, log_dir="logs", console_output=False):
     
     file_handler.setLevel(log_level)
     file_handler.setFormatter(formatter)
-    root_logger.addHandler(file_handler)
+    output_handlers.append(file_handler)
+    
+    # Loggers only enqueue records; the listener thread formats and writes them
+    log_queue = queue.Queue(-1)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, *output_handlers, respect_handler_level=True)
+    listener.start()
+    # Flush whatever is still queued when the process exits
+    atexit.register(listener.stop)
     
     # Create a specific logger for the bot
     bot_logger = logging.getLogger("feedback_bot")
     bot_logger.setLevel(log_level)
+    bot_logger._listener = listener
     
     # Log the configuration (this will only appear in file if console_output=False)
     output_info = "file only" if not console_output else "file and console"
-    bot_logger.info(f"Logging configured - Level: {logging.getLevelName(log_level)}, Output: {output_info}")
-    bot_logger.info(f"Log files will be stored in: {log_path.absolute()}")
-    bot_logger.info(f"Current log file: {log_filename}")
-    bot_logger.info("Daily log rotation enabled (midnight, keep 30 days)")
+    bot_logger.info(
+        "Logging configured - Level: %s, Output: %s\n"
+        "Log files will be stored in: %s\n"
+        "Current log file: %s\n"
+        "Daily log rotation enabled (midnight, keep 30 days)",
+        logging.getLevelName(log_level), output_info, log_path.absolute(), log_filename
+    )
     
+    _CONFIGURED = True
     return bot_logger
 
 
@@ -4,10 +4,12 @@ notifications.py
 Utility functions for sending notifications to curators and other users.
 """
 
+import asyncio
 import logging
 from typing import List, Optional
 from aiogram import Bot
 from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest
+from aiogram.methods import SendMessage
 from sqlmodel import select
 
 from db import async_session
@@ -15,6 +17,34 @@ from models import Curator, CuratorCourse, Course
 
 logger = logging.getLogger(__name__)
 
+# Max notifications in flight at once (Telegram allows ~30 messages/second per bot)
+NOTIFICATION_CONCURRENCY = 25
+
+# Display name used for anonymous feedback and the sender indicators
+_ANON_NAME = "Аноним"
+_INDICATOR_ANON = "🔒 "
+_INDICATOR_USER = "👤 "
+
+def _build_notification_text(course_name: str, student_username: str, topic: str, feedback_text: str) -> str:
+    """Formats the curator notification, truncating long feedback to fit one Telegram message."""
+    anonymity_indicator = _INDICATOR_ANON if student_username == _ANON_NAME else _INDICATOR_USER
+    
+    header = (
+        f"📬 <b>Новый отзыв по курсу '{course_name}'</b>\n\n"
+        f"{anonymity_indicator}<b>От:</b> {student_username}\n"
+        f"📝 <b>Тема:</b> {topic}\n\n"
+        f"💬 <b>Отзыв:</b>\n"
+    )
+    
+    # Truncate the feedback up front if the message would be too long
+    # (Telegram message limit is ~4096 characters), so the text is built once
+    suffix = ""
+    if len(header) + len(feedback_text) > 4000:
+        feedback_text = feedback_text[:3800] + "..."
+        suffix = "\n\n<i>Сообщение сокращено из-за размера.</i>"
+    return header + feedback_text + suffix
+
+
 async def notify_curators_about_feedback(
     bot: Bot,
     course_id: int,
@@ -37,72 +67,62 @@ async def notify_curators_about_feedback(
     Returns:
         Number of curators successfully notified
     """
+    # Find all curators for this course who have tg_user_id; the course name
+    # comes back on every row, so no separate Course lookup is needed
+    curators_stmt = (
+        select(Curator.tg_user_id, Curator.tg_username, Course.name)
+        .join(CuratorCourse, Curator.id == CuratorCourse.curator_id)
+        .join(Course, Course.id == CuratorCourse.course_id)
+        .where(
+            CuratorCourse.course_id == course_id,
+            Curator.tg_user_id.is_not(None)
+        )
+    )
+
+    # Send notifications to all curators concurrently, bounded to stay under
+    # Telegram's ~30 messages/second bot-wide limit
+    semaphore = asyncio.Semaphore(NOTIFICATION_CONCURRENCY)
+    base_message: Optional[SendMessage] = None
+
+    async def _send(tg_user_id: int, tg_username: str) -> int:
+        async with semaphore:
+            try:
+                await bot(base_message.model_copy(update={"chat_id": tg_user_id}))
+                logger.info(f"Sent feedback notification to curator '{tg_username}' (ID: {tg_user_id})")
+                return 1
+            except TelegramForbiddenError:
+                logger.warning(f"Curator '{tg_username}' (ID: {tg_user_id}) has blocked the bot")
+            except TelegramBadRequest as e:
+                logger.warning(f"Failed to send notification to curator '{tg_username}' (ID: {tg_user_id}): {e}")
+            except Exception as e:
+                logger.error(f"Unexpected error sending notification to curator '{tg_username}' (ID: {tg_user_id}): {e}")
+            return 0
+
+    send_tasks: List[asyncio.Task] = []
     try:
         async with async_session() as session:
-            # Get course name if not provided
-            if course_name is None:
-                course = await session.get(Course, course_id)
-                course_name = course.name if course else f"[Курс ID: {course_id}]"
-            
-            # Find all curators for this course who have tg_user_id
-            curators_stmt = (
-                select(Curator)
-                .join(CuratorCourse, Curator.id == CuratorCourse.curator_id)
-                .where(
-                    CuratorCourse.course_id == course_id,
-                    Curator.tg_user_id.is_not(None)
-                )
-            )
-            curators_result = await session.execute(curators_stmt)
-            curators = curators_result.scalars().all()
-            
-            if not curators:
-                logger.info(f"No curators with tg_user_id found for course '{course_name}' (ID: {course_id})")
-                return 0
-            
-            # Prepare notification message
-            is_anonymous = student_username == "Аноним"
-            anonymity_indicator = "🔒 " if is_anonymous else "👤 "
-            
-            notification_text = (
-                f"📬 <b>Новый отзыв по курсу '{course_name}'</b>\n\n"
-                f"{anonymity_indicator}<b>От:</b> {student_username}\n"
-                f"📝 <b>Тема:</b> {topic}\n\n"
-                f"💬 <b>Отзыв:</b>\n{feedback_text}"
-            )
-            
-            # Truncate if too long (Telegram message limit is ~4096 characters)
-            if len(notification_text) > 4000:
-                truncated_feedback = feedback_text[:3800] + "..."
-                notification_text = (
-                    f"📬 <b>Новый отзыв по курсу '{course_name}'</b>\n\n"
-                    f"{anonymity_indicator}<b>От:</b> {student_username}\n"
-                    f"📝 <b>Тема:</b> {topic}\n\n"
-                    f"💬 <b>Отзыв:</b>\n{truncated_feedback}\n\n"
-                    f"<i>Сообщение сокращено из-за размера.</i>"
-                )
-            
-            # Send notifications to all curators
-            successful_notifications = 0
-            for curator in curators:
-                try:
-                    await bot.send_message(
-                        chat_id=curator.tg_user_id,
-                        text=notification_text
+            # Stream rows so the first sends start while the rest are still arriving
+            curators_result = await session.stream(curators_stmt)
+            async for tg_user_id, tg_username, row_course_name in curators_result:
+                if base_message is None:
+                    if course_name is None:
+                        course_name = row_course_name
+                    # Validated once; each curator gets a cheap copy with only chat_id swapped
+                    base_message = SendMessage(
+                        chat_id=0,
+                        text=_build_notification_text(course_name, student_username, topic, feedback_text)
                     )
-                    successful_notifications += 1
-                    logger.info(f"Sent feedback notification to curator '{curator.tg_username}' (ID: {curator.tg_user_id})")
-                    
-                except TelegramForbiddenError:
-                    logger.warning(f"Curator '{curator.tg_username}' (ID: {curator.tg_user_id}) has blocked the bot")
-                except TelegramBadRequest as e:
-                    logger.warning(f"Failed to send notification to curator '{curator.tg_username}' (ID: {curator.tg_user_id}): {e}")
-                except Exception as e:
-                    logger.error(f"Unexpected error sending notification to curator '{curator.tg_username}' (ID: {curator.tg_user_id}): {e}")
-            
-            logger.info(f"Feedback notifications sent: {successful_notifications}/{len(curators)} curators for course '{course_name}'")
-            return successful_notifications
-            
+                send_tasks.append(asyncio.create_task(_send(tg_user_id, tg_username)))
     except Exception as e:
+        # Sends already started are still awaited below
         logger.error(f"Error in notify_curators_about_feedback for course {course_id}: {e}")
-        return 0 
\ No newline at end of file
+
+    if not send_tasks:
+        logger.info(f"No curators with tg_user_id found for course '{course_name or ''}' (ID: {course_id})")
+        return 0
+
+    # _send handles its own errors, so gather never raises here
+    successful_notifications = sum(await asyncio.gather(*send_tasks))
+    
+    logger.info(f"Feedback notifications sent: {successful_notifications}/{len(send_tasks)} curators for course '{course_name}'")
+    return successful_notifications
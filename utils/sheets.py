@@ -5,16 +5,46 @@ utils/sheets.py
 Utility to interact with Google Sheets API for storing feedback.
 """
 
+import asyncio
 import gspread
 import gspread_asyncio
 from google.oauth2.service_account import Credentials
 from datetime import datetime
 import logging
+import random
 import re
-import hashlib
+import zlib
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+# Quota (429) and transient server errors are retried with truncated exponential backoff
+RETRYABLE_STATUS_CODES = (429, 500, 503)
+MAX_WRITE_ATTEMPTS = 4
+
+# Buffered rows are written with one append_rows call per sheet on size or time threshold
+BUFFER_FLUSH_SIZE = 50
+BUFFER_FLUSH_INTERVAL = 2.0  # seconds
+
+# Row background per survey session; 8 entries so a hash can be bucketed with `& 7`
+_SESSION_PALETTE = (
+    {"red":0.98, "green":0.94, "blue":0.96},  # бледно-розовый
+    {"red":0.94, "green":0.98, "blue":0.94},  # бледно-зелёный
+    {"red":0.94, "green":0.96, "blue":0.98},  # бледно-голубой
+    {"red":0.96, "green":0.94, "blue":0.98},  # бледно-лиловый
+    {"red":0.98, "green":0.96, "blue":0.94},  # бледно-персиковый
+    {"red":0.96, "green":0.98, "blue":0.94},  # бледно-мятный
+    {"red":0.94, "green":0.98, "blue":0.96},  # бледно-аквамариновый
+    {"red":0.96, "green":0.94, "blue":0.96},  # бледно-лилово-розовый
+)
+
+# Spreadsheet ID in a https://docs.google.com/spreadsheets/d/<id>/... URL
+_SPREADSHEET_ID_RE = re.compile(r"/d/([\w-]+)")
+
+# Characters Google Sheets does not allow in tab titles
+_UNSAFE_TITLE_RE = re.compile(r"[\\/?*\[\]:]")
+
+
 def get_creds(service_account_file):
     """Get credentials for Google Sheets API from service account file."""
     scopes = [
@@ -38,47 +68,173 @@ class GoogleSheetsManager:
     def __init__(self, creds_path, spreadsheet_url, sheet_name="feedback"):
         self.creds_path = creds_path
         self.spreadsheet_url = spreadsheet_url
+        # Extract spreadsheet ID from URL once; a malformed URL fails here, not on first write
+        match = _SPREADSHEET_ID_RE.search(spreadsheet_url or "")
+        if match is None:
+            raise ValueError(f"Not a Google Sheets spreadsheet URL: {spreadsheet_url!r}")
+        self._spreadsheet_id = match.group(1)
         self.sheet_name = sheet_name
         self.agcm = gspread_asyncio.AsyncioGspreadClientManager(
             lambda: get_creds(self.creds_path)
         )
+        # Authorized client, reused until the API rejects it (see _write_with_reauth)
+        self._client = None
+        # Spreadsheet/worksheet handles are stable for the bot's lifetime; opened once and reused
+        self._spreadsheet = None
+        self._worksheets: dict = {}
+        self._worksheets_listed = False
+        # Per-sheet row buffers, drained by one flusher task per sheet
+        self._buffers: dict[str, list[list]] = {}
+        self._buffer_headers: dict[str, list[str]] = {}
+        self._buffer_events: dict[str, asyncio.Event] = {}
+        self._flusher_tasks: dict[str, asyncio.Task] = {}
+        # Set by close(); flushers exit after their current write instead of being cancelled
+        self._closing = False
         
     async def get_client(self):
         """Get an authenticated Google Sheets client."""
         try:
-            return await self.agcm.authorize()
+            if self._client is None:
+                self._client = await self.agcm.authorize()
+            return self._client
         except Exception as e:
             logger.error(f"Error authenticating with Google Sheets: {e}")
             return None
     
-    async def ensure_worksheet_exists(self, client, headers, sheet_name: str):
-        """Ensure the worksheet exists and has the correct headers."""
-        try:
-            # Extract spreadsheet ID from URL
-            spreadsheet_id = self.spreadsheet_url.split("/d/")[1].split("/")[0]
-            spreadsheet = await client.open_by_key(spreadsheet_id)
-            
-            # Check if worksheet exists
+    async def _call_with_backoff(self, func, *args):
+        """Runs a Sheets call, retrying 429/5xx API errors with jittered exponential backoff."""
+        for attempt in range(MAX_WRITE_ATTEMPTS):
             try:
-                worksheet = await spreadsheet.worksheet(sheet_name)
-            except gspread.exceptions.WorksheetNotFound:
-                # Create worksheet if it doesn't exist
-                worksheet = await spreadsheet.add_worksheet(
-                    title=sheet_name, 
-                    rows=1, 
-                    cols=len(headers)
-                )
-                # Set headers
-                await worksheet.append_row(headers)
-                
+                return await func(*args)
+            except gspread.exceptions.APIError as e:
+                status = getattr(e.response, "status_code", None)
+                if status not in RETRYABLE_STATUS_CODES or attempt + 1 == MAX_WRITE_ATTEMPTS:
+                    raise
+                delay = min(2 ** attempt, 32) + random.random()
+                logger.warning(f"Google Sheets returned {status}, retrying in {delay:.1f}s (attempt {attempt + 1}/{MAX_WRITE_ATTEMPTS})")
+                await asyncio.sleep(delay)
+
+    async def _get_spreadsheet(self, client):
+        """Return the cached spreadsheet handle, opening it on first use."""
+        if self._spreadsheet is None:
+            self._spreadsheet = await client.open_by_key(self._spreadsheet_id)
+        return self._spreadsheet
+
+    def _invalidate_handles(self):
+        """Forget cached handles after an API error (e.g. a tab was deleted or renamed)."""
+        self._spreadsheet = None
+        self._worksheets.clear()
+        self._worksheets_listed = False
+
+    async def _open_worksheet(self, client, headers, sheet_name: str):
+        """Return the cached worksheet, opening or creating it on first use; raises on API errors."""
+        worksheet = self._worksheets.get(sheet_name)
+        if worksheet is not None:
             return worksheet
-        except Exception as e:
-            logger.error(f"Error ensuring worksheet exists: {e}")
-            return None
+        spreadsheet = await self._get_spreadsheet(client)
+        
+        # One listing fills the cache with every existing tab, so a missing
+        # worksheet is a dict miss instead of an API error
+        if not self._worksheets_listed:
+            for existing in await spreadsheet.worksheets():
+                self._worksheets[existing.title] = existing
+            self._worksheets_listed = True
+            worksheet = self._worksheets.get(sheet_name)
+            if worksheet is not None:
+                return worksheet
+
+        # Create worksheet if it doesn't exist
+        worksheet = await spreadsheet.add_worksheet(
+            title=sheet_name, 
+            rows=1, 
+            cols=len(headers)
+        )
+        # Set headers
+        await worksheet.append_row(headers)
+            
+        self._worksheets[sheet_name] = worksheet
+        return worksheet
+
+    async def _write_with_reauth(self, write):
+        """Run `write(client)`; on a 401 drop the cached client and handles and retry once."""
+        for attempt in range(2):
+            client = await self.get_client()
+            if client is None:
+                raise RuntimeError("Could not get Google Sheets client")
+            try:
+                return await write(client)
+            except gspread.exceptions.APIError as e:
+                self._invalidate_handles()
+                if attempt or getattr(e.response, "status_code", None) != 401:
+                    raise
+                logger.warning("Google Sheets rejected the cached credentials (401), re-authorizing")
+                self._client = None
     
+    def _buffer_row(self, sheet_name: str, headers: list[str], row: list) -> None:
+        """Queue a row for the sheet's flusher, starting the flusher on first use."""
+        self._buffers.setdefault(sheet_name, []).append(row)
+        self._buffer_headers[sheet_name] = headers
+        event = self._buffer_events.setdefault(sheet_name, asyncio.Event())
+        if len(self._buffers[sheet_name]) >= BUFFER_FLUSH_SIZE:
+            event.set()
+        task = self._flusher_tasks.get(sheet_name)
+        if (task is None or task.done()) and not self._closing:
+            self._flusher_tasks[sheet_name] = asyncio.create_task(self._flusher(sheet_name))
+
+    async def _flusher(self, sheet_name: str) -> None:
+        event = self._buffer_events[sheet_name]
+        while True:
+            try:
+                await asyncio.wait_for(event.wait(), BUFFER_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            event.clear()
+            try:
+                await self._flush_buffer(sheet_name)
+            except Exception as e:
+                logger.exception(f"Unexpected error flushing rows to Google Sheets tab '{sheet_name}': {e}")
+            if self._closing:
+                return
+
+    async def _flush_buffer(self, sheet_name: str) -> bool:
+        """Write everything buffered for a sheet with a single append_rows call."""
+        rows = self._buffers.get(sheet_name)
+        if not rows:
+            return True
+        # Swap the buffer out before awaiting so rows added meanwhile go to the next batch
+        self._buffers[sheet_name] = []
+
+        headers = self._buffer_headers[sheet_name]
+
+        async def write(client):
+            worksheet = await self._open_worksheet(client, headers, sheet_name)
+            await self._call_with_backoff(worksheet.append_rows, rows)
+
+        try:
+            await self._write_with_reauth(write)
+            return True
+        except Exception as e:
+            logger.error(f"Dropped {len(rows)} rows for Google Sheets tab '{sheet_name}': {e}")
+            return False
+
+    async def close(self) -> None:
+        """Stop the flushers and write whatever is still buffered."""
+        # Wake the flushers and wait for them: cancelling one mid-write would lose the
+        # rows it already swapped out of its buffer
+        self._closing = True
+        for event in self._buffer_events.values():
+            event.set()
+        await asyncio.gather(*self._flusher_tasks.values(), return_exceptions=True)
+        self._flusher_tasks.clear()
+        for sheet_name in list(self._buffers):
+            await self._flush_buffer(sheet_name)
+
     async def add_feedback(self, feedback_data):
         """
         Add feedback to Google Sheets.
+
+        The row is buffered and written in a batch by the sheet's flusher,
+        so this returns as soon as the row is queued.
         
         feedback_data should be a dictionary with:
         - timestamp: datetime object
@@ -87,16 +243,7 @@ class GoogleSheetsManager:
         - topic: string
         - text: string
         """
-        client = await self.get_client()
-        if not client:
-            logger.error("Could not get Google Sheets client")
-            return False
-        
         headers = ["Timestamp", "Username", "Course", "Topic", "Feedback"]
-        worksheet = await self.ensure_worksheet_exists(client, headers, self.sheet_name)
-        if not worksheet:
-            logger.error("Could not get or create worksheet")
-            return False
             
         # Format the timestamp
         timestamp = feedback_data.get("timestamp", datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
@@ -110,13 +257,8 @@ class GoogleSheetsManager:
             feedback_data.get("text", "")
         ]
         
-        try:
-            # Append the row to the worksheet
-            await worksheet.append_row(row)
-            return True
-        except Exception as e:
-            logger.error(f"Error adding feedback to Google Sheets: {e}")
-            return False
+        self._buffer_row(self.sheet_name, headers, row)
+        return True
 
     async def add_survey_response(self, response_data):
         """
@@ -132,13 +274,20 @@ class GoogleSheetsManager:
         - question_type: string
         - answer: string
         """
-        client = await self.get_client()
-        if not client:
-            logger.error("Could not get Google Sheets client for survey response")
-            return False
+        return await self.add_survey_responses([response_data])
+
+    async def add_survey_responses(self, responses):
+        """
+        Add a batch of survey responses of one survey to Google Sheets.
         
-        raw_title = response_data.get("survey_title", "survey")
-        safe_title = re.sub(r"[\\\/\?\*\[\]\:]", "_", raw_title)[:100]
+        All rows are appended and colored with a single batch_update call.
+        Each item has the same keys as for add_survey_response.
+        """
+        if not responses:
+            return True
+
+        raw_title = responses[0].get("survey_title", "survey")
+        safe_title = _UNSAFE_TITLE_RE.sub("_", raw_title)[:100]
         sheet_name = safe_title or "survey"
         headers = [
             "Timestamp", 
@@ -152,81 +301,60 @@ class GoogleSheetsManager:
             "Session ID"
         ]
         
-        worksheet = await self.ensure_worksheet_exists(client, headers, sheet_name)
-        if not worksheet:
-            logger.error("Could not get or create survey responses worksheet")
-            return False
-        
-        # Format the timestamp
-        timestamp = response_data.get("timestamp", datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+        rows = []
+        for response_data in responses:
+            # Format the timestamp
+            timestamp = response_data.get("timestamp", datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+            rows.append([
+                timestamp,
+                response_data.get("student_username", ""),
+                response_data.get("course_name", ""),
+                response_data.get("group_name", ""),
+                response_data.get("survey_title", ""),
+                response_data.get("question_text", ""),
+                response_data.get("question_type", ""),
+                response_data.get("answer", ""),
+                response_data.get("session_id", "")
+            ])
         
-        # Prepare row data
-        row = [
-            timestamp,
-            response_data.get("student_username", ""),
-            response_data.get("course_name", ""),
-            response_data.get("group_name", ""),
-            response_data.get("survey_title", ""),
-            response_data.get("question_text", ""),
-            response_data.get("question_type", ""),
-            response_data.get("answer", ""),
-            response_data.get("session_id", "")
+        colored_rows = [
+            self._colored_row(row, self._get_color_for_session(response_data.get("session_id", "")))
+            for row, response_data in zip(rows, responses)
         ]
-        
+
+        async def write(client):
+            worksheet = await self._open_worksheet(client, headers, sheet_name)
+            spreadsheet = await self._get_spreadsheet(client)
+            # Values and session colors go out in one appendCells request, so no row
+            # numbers are needed and a batch is never left half-colored
+            await self._call_with_backoff(spreadsheet.batch_update, {"requests": [{
+                "appendCells": {
+                    "sheetId": worksheet.id,
+                    "rows": colored_rows,
+                    "fields": "userEnteredValue,userEnteredFormat.backgroundColor"
+                }
+            }]})
+
         try:
-            # Append the row to the worksheet
-            await worksheet.append_row(row)
-
-            col1 = await worksheet.col_values(1)
-            new_row = len(col1)
-
-            session_id = response_data.get("session_id","")
-            color = self._get_color_for_session(session_id)
-            spreadsheet_id = self.spreadsheet_url.split("/d/")[1].split("/")[0]
-            spreadsheet = await client.open_by_key(spreadsheet_id)
-            await self._color_row(
-                spreadsheet,
-                worksheet,
-                row_index=new_row,
-                color=color,
-                num_columns=len(headers)
-            )
-            return True
+            await self._write_with_reauth(write)
         except Exception as e:
-            logger.error(f"Error adding survey response to Google Sheets: {e}")
-            return False 
-
-    def _get_color_for_session(self, session_id: str) -> dict:
-        palette = [
-            {"red":0.98, "green":0.94, "blue":0.96},  # бледно-розовый
-            {"red":0.94, "green":0.98, "blue":0.94},  # бледно-зелёный
-            {"red":0.94, "green":0.96, "blue":0.98},  # бледно-голубой
-            {"red":0.96, "green":0.94, "blue":0.98},  # бледно-лиловый
-            {"red":0.98, "green":0.96, "blue":0.94},  # бледно-персиковый
-            {"red":0.96, "green":0.98, "blue":0.94},  # бледно-мятный
-            {"red":0.94, "green":0.98, "blue":0.96},  # бледно-аквамариновый
-            {"red":0.96, "green":0.94, "blue":0.96},  # бледно-лилово-розовый
-        ]
-        h = int(hashlib.sha256(session_id.encode()).hexdigest(), 16)
-        return palette[h % len(palette)]
-
-    async def _color_row(self, spreadsheet, worksheet, row_index: int, color: dict, num_columns: int):
-        sheet_id = worksheet.id
-        requests = [{
-            "repeatCell": {
-                "range": {
-                    "sheetId": sheet_id,
-                    "startRowIndex": row_index - 1,
-                    "endRowIndex": row_index,
-                    "startColumnIndex": 0,
-                    "endColumnIndex": num_columns
-                },
-                "cell": {
-                    "userEnteredFormat": {
-                        "backgroundColor": color
-                    }
-                },
-                "fields": "userEnteredFormat.backgroundColor"
+            logger.error(f"Error adding survey responses to Google Sheets: {e}")
+            return False
+        return True
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _get_color_for_session(session_id: str) -> dict:
+        # Visual bucket only: crc32 is plenty, and a session writes many rows so the result is cached
+        return _SESSION_PALETTE[zlib.crc32(session_id.encode()) & 7]
+
+    @staticmethod
+    def _colored_row(values, color: dict) -> dict:
+        """RowData for appendCells: string cells (as RAW append_rows wrote them) with a background color."""
+        return {"values": [
+            {
+                "userEnteredValue": {"stringValue": str(value)},
+                "userEnteredFormat": {"backgroundColor": color}
             }
-        }]
-        await spreadsheet.batch_update({"requests": requests})
\ No newline at end of file
+            for value in values
+        ]}
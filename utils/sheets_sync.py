@@ -0,0 +1,147 @@
+"""
+utils/sheets_sync.py
+~~~~~~~~~~~~~~~~~~~~~~
+
+Periodic export of survey responses from the database to Google Sheets.
+
+The database is the source of truth; answer handlers never talk to Sheets.
+A background task picks up `Response` rows not yet marked `sheets_exported`
+every SHEETS_SYNC_INTERVAL seconds, appends them to the per-survey sheets in
+one write per survey, then marks them exported.
+"""
+
+import asyncio
+import logging
+from contextlib import suppress
+from functools import lru_cache
+
+from sqlalchemy import not_, update
+from sqlmodel import select
+
+from config import settings
+from db import async_session
+from models import Response
+from utils.sheets import GoogleSheetsManager
+
+logger = logging.getLogger(__name__)
+
+SHEETS_SYNC_INTERVAL = 30  # seconds between export runs
+SHEETS_SYNC_BATCH = 500  # rows read per page of an export run
+
+_sync_task: asyncio.Task | None = None
+
+
+# Google Sheets manager for survey responses, created on first use rather than at import; None if the URL is malformed
+@lru_cache(maxsize=1)
+def get_sheets_manager() -> GoogleSheetsManager | None:
+    try:
+        return GoogleSheetsManager(
+            creds_path=settings.google_credentials_path,
+            spreadsheet_url=settings.surveys_gsheet_url,
+            sheet_name=settings.surveys_gsheet_tab_name
+        )
+    except ValueError as e:
+        logger.error(f"Google Sheets export disabled, check SURVEYS_GSHEET_URL: {e}")
+        return None
+
+
+def _to_sheet_row(response: Response) -> dict:
+    return {
+        "timestamp": response.answered_at,
+        "student_username": response.student_tg_username,  # already "Аноним" for anonymous answers
+        "course_name": response.course_name,
+        "group_name": response.group_name,
+        "survey_title": response.survey_title,
+        "question_text": response.question_text,
+        "question_type": response.question_type.value,
+        "answer": response.answer,
+        "session_id": response.session_id or "",
+    }
+
+
+async def sync_responses_once() -> int:
+    """Exports all unexported responses, a page at a time, and returns how many rows were written.
+
+    Rows are flagged per survey write rather than tracked by a max-id cursor: ids are
+    allocated at insert, so concurrent flushes can commit out of id order. Delivery is
+    at-least-once: if flagging fails after a write, those rows are appended again.
+    """
+    sheets_manager = get_sheets_manager()
+    if sheets_manager is None:
+        return 0
+
+    written = 0
+    last_seen_id = 0
+    while True:
+        # Paging past the last seen id means a survey whose writes keep failing
+        # can't pin every run to the same page and starve the other surveys
+        async with async_session() as session:
+            result = await session.scalars(
+                select(Response)
+                .where(not_(Response.sheets_exported), Response.id > last_seen_id)  # uses ix_response_sheets_pending
+                .order_by(Response.id)
+                .limit(SHEETS_SYNC_BATCH)
+            )
+            responses = result.all()
+        # The session is closed here: no connection or transaction is held while Sheets is called
+        if not responses:
+            break
+        last_seen_id = responses[-1].id
+
+        # One append per survey sheet, in order of each survey's first pending row
+        by_title: dict[str, list[Response]] = {}
+        for response in responses:
+            by_title.setdefault(response.survey_title, []).append(response)
+
+        for survey_title, rows in by_title.items():
+            if not await sheets_manager.add_survey_responses([_to_sheet_row(r) for r in rows]):
+                logger.error(f"Failed to export {len(rows)} survey responses for '{survey_title}' to Google Sheets; will retry")
+                continue
+            # Short transaction per survey so a later failure can't re-export rows already written
+            async with async_session() as session:
+                await session.execute(
+                    update(Response)
+                    .where(Response.id.in_([r.id for r in rows]))
+                    .values(sheets_exported=True)
+                )
+                await session.commit()
+            written += len(rows)
+
+        if len(responses) < SHEETS_SYNC_BATCH:
+            break
+    logger.debug("Exported %d survey responses to Google Sheets.", written)
+    return written
+
+
+async def _sync_loop() -> None:
+    while True:
+        try:
+            await sync_responses_once()
+        except Exception as e:
+            logger.exception(f"Unexpected error exporting survey responses to Google Sheets: {e}")
+        await asyncio.sleep(SHEETS_SYNC_INTERVAL)
+
+
+async def start_sheets_sync() -> None:
+    global _sync_task
+    if not settings.sheets_enabled:
+        logger.info("Google Sheets export is disabled (SHEETS_ENABLED=false)")
+        return
+    # Build the manager now so a malformed URL is reported at startup
+    if get_sheets_manager() is None:
+        return
+    _sync_task = asyncio.create_task(_sync_loop())
+
+
+async def stop_sheets_sync() -> None:
+    """Stops the periodic task and exports whatever is still pending."""
+    if _sync_task is None:
+        return
+    _sync_task.cancel()
+    # Let an in-flight run finish unwinding so the final export can't duplicate its rows
+    with suppress(asyncio.CancelledError):
+        await _sync_task
+    try:
+        await sync_responses_once()
+    except Exception as e:
+        logger.error(f"Final Google Sheets export failed: {e}")